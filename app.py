@@ -1,22 +1,112 @@
 import os
 import io
+import csv
+import hashlib
+import itertools
 import json
-from datetime import date, datetime, timedelta
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import date, datetime
+import httplib2
+import numpy as np
+import orjson
 import pandas as pd
 from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    jsonify() backed by orjson. Keys are sorted like Flask's default provider,
+    numpy scalars from pandas results are serialized natively, and dates still
+    go through Flask's default handler so their format is unchanged.
+    """
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+              | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    @staticmethod
+    def default(o):
+        if o is pd.NaT:
+            return None
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        option = self.option
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Brotli when the client accepts it, gzip otherwise; tiny bodies are sent as-is.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 256
+Compress(app)
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
 CREDENTIALS_FILE = 'credentials.json'
 TOKEN_FILE = 'token.json'
 
+_CREDS = None
+_LOCK = threading.Lock()
+_THREAD_STATE = threading.local()
+_FILE_ID_CACHE = OrderedDict()
+_FILE_ID_CACHE_SIZE = 512
+_DRIVE_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+_DATAFRAME_CACHE = OrderedDict()
+_DATAFRAME_CACHE_SIZE = 32
+# Estimated in-memory bytes of cached frames and their date indexes; the
+# oldest frames are evicted past the budget.
+_DATAFRAME_CACHE_MAX_BYTES = int(os.environ.get('DATAFRAME_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+_DATAFRAME_CACHE_NBYTES = {}
+_DATAFRAME_CACHE_LOCK = threading.Lock()
+_DATE_INDEX_CACHE = OrderedDict()
+_DATE_INDEX_CACHE_SIZE = 32
+_DATE_INDEX_CACHE_NBYTES = {}
+_QUERY_RESULT_CACHE = OrderedDict()
+_QUERY_RESULT_CACHE_SIZE = 256
+_QUARTER_END_DAY = {3: 31, 6: 30, 9: 30, 12: 31}
+PARQUET_CACHE_DIR = os.environ.get('PARQUET_CACHE_DIR',
+                                   os.path.join(tempfile.gettempdir(), 'intergold_cache'))
+PARQUET_CACHE_MAX_BYTES = int(os.environ.get('PARQUET_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+DRIVE_HTTP_TIMEOUT = 30
+# Resolved ids are trusted this long before the name is looked up again.
+FILE_ID_TTL = 300
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+DOWNLOAD_SPOOL_SIZE = 16 * 1024 * 1024
+# /check_headers on a CSV only needs the top rows: detection probes five and
+# the preview reads five more after the header.
+HEADER_PEEK_SIZE = 64 * 1024
+HEADER_PEEK_LINES = 16
+# Rows scored as header candidates, and rows read under the header when
+# matching requested column names.
+HEADER_CHECK_ROWS = 5
+# A header name made only of digits, dots and dashes reads as data, not a label.
+_NUMERIC_NAME = re.compile(r'[\d.\-]*\d[\d.\-]*').fullmatch
+DATE_SAMPLE_SIZE = 1000
+DATE_STRATEGIES = [{}, {'dayfirst': True}] + [
+    {'format': fmt} for fmt in ['%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d', '%d-%m-%Y']]
+
 def load_credentials_from_env():
+    """
+    Write credentials.json/token.json from the environment if they are missing.
+    Called once at import; returns whether both files are in place.
+    """
     try:
         if 'GOOGLE_CREDENTIALS_JSON' in os.environ:
             if not os.path.exists(CREDENTIALS_FILE):
@@ -30,97 +120,754 @@ def load_credentials_from_env():
         return False
     return os.path.exists(CREDENTIALS_FILE) and os.path.exists(TOKEN_FILE)
 
+def get_credentials():
+    """
+    Return the process-wide Credentials, loading token.json once and
+    refreshing only when the cached token is no longer valid.
+    """
+    global _CREDS
+    with _LOCK:
+        if _CREDS and _CREDS.valid:
+            return _CREDS
+        creds = _CREDS
+        if creds is None and os.path.exists(TOKEN_FILE):
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                return None
+            with open(TOKEN_FILE, 'w') as token_file:
+                token_file.write(creds.to_json())
+        _CREDS = creds
+        return creds
+
 def get_drive_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            return None
-        with open(TOKEN_FILE, 'w') as token_file:
-            token_file.write(creds.to_json())
-    try:
-        service = build('drive', 'v3', credentials=creds)
-        return service
-    except HttpError:
+    """
+    Return a Drive service for the current thread.
+    httplib2 connections are not thread-safe, so each worker thread keeps its
+    own service built on the shared credentials. The service's single
+    httplib2.Http keeps its TLS connection to Google alive between requests.
+    """
+    creds = get_credentials()
+    if not creds:
         return None
+    service = getattr(_THREAD_STATE, 'service', None)
+    if service is None or _THREAD_STATE.creds is not creds:
+        try:
+            # The discovery document ships with google-api-python-client,
+            # so there is no need to fetch it over the network.
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=DRIVE_HTTP_TIMEOUT))
+            service = build('drive', 'v3', http=http,
+                            cache_discovery=False, static_discovery=True)
+        except HttpError:
+            return None
+        _THREAD_STATE.service = service
+        _THREAD_STATE.creds = creds
+    return service
 
-def find_file_id_by_name(service, file_name):
-    search_query = f"name contains '{file_name}' and trashed=false"
+def find_file_by_name(service, file_name, prefix=False, use_cache=True):
+    """
+    Resolve a file name to its Drive file, as (file, error).
+    Successful lookups are remembered for FILE_ID_TTL seconds so repeat
+    queries skip the files().list round trip. A fresh lookup also carries
+    modifiedTime and md5Checksum, so callers can skip a separate
+    get_file_metadata call; a remembered one has only the id and name.
+    With prefix=True the name only has to be contained in the file's name;
+    those lookups are not remembered. use_cache=False always asks Drive,
+    and refreshes the remembered id.
+    """
+    if not prefix and use_cache:
+        cached = _cache_get(_FILE_ID_CACHE, file_name)
+        if cached is not None and cached[1] > time.monotonic():
+            return {'id': cached[0], 'name': file_name}, None
+    # Exact-name equality is answered from Drive's name index; two results are
+    # enough to detect an ambiguous name.
+    escaped = file_name.replace('\\', '\\\\').replace("'", "\\'")
+    operator = 'contains' if prefix else '='
+    search_query = f"name {operator} '{escaped}' and trashed=false"
     try:
         results = service.files().list(q=search_query,
-                                       pageSize=5,
-                                       fields="files(id, name)").execute()
+                                       spaces='drive',
+                                       corpora='user',
+                                       pageSize=2,
+                                       fields="files(id,name,modifiedTime,md5Checksum)").execute()
         items = results.get('files', [])
         if not items:
             return None, f"File not found: '{file_name}'"
         if len(items) > 1:
             return None, f"Multiple files found with name: '{file_name}'. Please use a unique name."
-        return items[0]['id'], None
+        if not prefix:
+            _cache_put(_FILE_ID_CACHE, _FILE_ID_CACHE_SIZE, file_name,
+                       (items[0]['id'], time.monotonic() + FILE_ID_TTL))
+        return items[0], None
     except HttpError as error:
         return None, f"An error occurred searching for file: {error}"
 
-def detect_header_row(content, file_name, max_rows_to_check=5):
+def find_file_id_by_name(service, file_name, prefix=False, use_cache=True):
     """
-    Automatically detect header row by checking first few rows.
-    Returns the skiprows value (0 if headers are in first row).
+    Resolve a file name to its Drive file id, as (file_id, error).
+    """
+    file, error = find_file_by_name(service, file_name, prefix, use_cache)
+    return (file['id'] if file else None), error
+
+def with_drive_file(service, file_name, action, prefix=False):
     """
-    for skip in range(max_rows_to_check):
+    Resolve file_name and return (action(file), None), or (None, error) if the
+    name can't be resolved. A remembered id goes stale when the file is
+    deleted or replaced under the same name; if Drive answers 404 for one,
+    it is forgotten and the name looked up again before retrying once.
+    """
+    file, error = find_file_by_name(service, file_name, prefix)
+    if error:
+        return None, error
+    try:
+        return action(file), None
+    except HttpError as error:
+        # A fresh lookup's 404 is genuine; only a remembered id is retried.
+        if error.resp.status != 404 or 'modifiedTime' in file:
+            raise
+    forget_file(file_name, file['id'])
+    file, error = find_file_by_name(service, file_name, prefix)
+    if error:
+        return None, error
+    return action(file), None
+
+def download_file(service, file_id):
+    """
+    Stream a Drive file in chunks into a spooled temporary file.
+    Small files stay in memory, large ones spill to disk instead of
+    being held as one bytes object. Returns the handle rewound to the start.
+    """
+    fh = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_SIZE)
+    downloader = MediaIoBaseDownload(fh, service.files().get_media(fileId=file_id),
+                                     chunksize=DOWNLOAD_CHUNK_SIZE)
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+    fh.seek(0)
+    return fh
+
+def download_file_head(service, file_id, size=HEADER_PEEK_SIZE):
+    """
+    Fetch only the first `size` bytes of a Drive file with a Range request,
+    cut back to the last complete line. Returns None when that holds fewer
+    than HEADER_PEEK_LINES lines; callers then download the whole file.
+    """
+    req = service.files().get_media(fileId=file_id)
+    req.headers['Range'] = f'bytes=0-{size - 1}'
+    content = req.execute()
+    if len(content) < size:
+        return io.BytesIO(content)
+    content = content[:content.rfind(b'\n') + 1]
+    if content.count(b'\n') < HEADER_PEEK_LINES:
+        return None
+    return io.BytesIO(content)
+
+def read_csv_file(fh, **kwargs):
+    """
+    Parse a CSV file handle with pyarrow's multi-threaded reader, falling back to the
+    default C engine when pyarrow is unavailable or rejects the input.
+    """
+    arrow_kwargs = dict(kwargs)
+    # The pyarrow engine only honours an integer skiprows through `header`.
+    skiprows = arrow_kwargs.pop('skiprows', None)
+    arrow_kwargs['header'] = skiprows or 0
+    try:
+        fh.seek(0)
+        df = pd.read_csv(fh, engine='pyarrow', **arrow_kwargs)
+        cols = [str(c) for c in df.columns]
+        # Blank or repeated header cells get 'Unnamed: N' / 'name.1' from the
+        # C engine; let it handle those so column names stay the same.
+        if all(c.strip() for c in cols) and len(set(cols)) == len(cols):
+            return df
+    except Exception:
+        pass
+    fh.seek(0)
+    return pd.read_csv(fh, **kwargs)
+
+class SheetNotFoundError(ValueError):
+    """
+    A workbook has no sheet by the requested name or position.
+    """
+
+def open_workbook(fh):
+    """
+    Open an Excel workbook with the calamine engine, falling back to openpyxl
+    for workbooks calamine cannot open. Returns None if neither can, e.g. for
+    a CSV saved under an Excel extension.
+    """
+    for engine in ('calamine', 'openpyxl'):
+        fh.seek(0)
         try:
-            if file_name.lower().endswith('.csv'):
-                df_test = pd.read_csv(io.BytesIO(content), skiprows=skip, nrows=3)
-            else:
-                df_test = pd.read_excel(io.BytesIO(content), sheet_name=0,
-                                        engine='openpyxl', skiprows=skip, nrows=3)
-            cols = df_test.columns.tolist()
-            unnamed_count = sum(1 for c in cols if str(c).startswith('Unnamed:'))
-            numeric_count = sum(1 for c in cols if str(c).replace('.', '').replace('-', '').isdigit())
-            empty_count = sum(1 for c in cols if not str(c).strip())
-            text_count = len(cols) - unnamed_count - numeric_count - empty_count
-            if text_count > len(cols) * 0.5 and (unnamed_count + numeric_count) < len(cols) * 0.3 and len(cols) > 3:
-                return skip, cols
+            return pd.ExcelFile(fh, engine=engine)
         except Exception:
-            continue
+            pass
+    return None
+
+def parse_workbook(book, sheet_name=0, **kwargs):
+    """
+    ExcelFile.parse that checks the requested sheets first. sheet_name is a
+    name or 0-based position, a list of them, or None for every sheet; an
+    integer that is also the exact name of a sheet means that sheet. Raises
+    SheetNotFoundError listing the workbook's sheets if one is missing.
+    """
+    names = book.sheet_names
+    def check(sheet):
+        if isinstance(sheet, int) and str(sheet) in names:
+            return str(sheet)
+        if sheet in names or (isinstance(sheet, int) and 0 <= sheet < len(names)):
+            return sheet
+        raise SheetNotFoundError(f"Sheet not found: {sheet!r}. Available sheets: {names}")
+    if isinstance(sheet_name, list):
+        sheet_name = [check(sheet) for sheet in sheet_name]
+    elif sheet_name is not None:
+        sheet_name = check(sheet_name)
+    return book.parse(sheet_name=sheet_name, **kwargs)
+
+def parse_sheet_name(args):
+    """
+    Read sheetName from request args. An all-digit value is a 0-based sheet
+    position (unless a sheet has exactly that name); the default is the
+    first sheet.
+    """
+    sheet_name = args.get('sheetName', 0)
+    if isinstance(sheet_name, str) and sheet_name.isdigit():
+        return int(sheet_name)
+    return sheet_name
+
+def resolve_file_name(file_name):
+    """
+    find_file_id_by_name for use from _DRIVE_EXECUTOR threads, each of which
+    uses its own per-thread Drive service. Names are always looked up fresh,
+    since the caller wants the id Drive serves now, not a remembered one.
+    """
+    service = get_drive_service()
+    if not service:
+        return None, "Could not authenticate with Google Drive."
+    return find_file_id_by_name(service, file_name, use_cache=False)
+
+def read_header_probe(fh, nrows, book=None, sheet_name=0):
+    """
+    Read the first `nrows` rows of a file once, as lists of raw cell values,
+    so header detection and column resolution share one parse. book is the
+    file opened with open_workbook; without one, fh is read as CSV.
+    Returns [] if the rows can't be read.
+    """
+    try:
+        if book is not None:
+            return parse_workbook(book, sheet_name, header=None, nrows=nrows).values.tolist()
+        fh.seek(0)
+        text = io.TextIOWrapper(fh, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            return list(itertools.islice(csv.reader(text), nrows))
+        finally:
+            text.detach()
+    except Exception:
+        return []
+
+def classify_header_names(cols):
+    """
+    Count header names that are pandas placeholders, numeric-looking or
+    blank, in one pass. Returns (unnamed, numeric, empty).
+    """
+    unnamed = numeric = empty = 0
+    for c in cols:
+        name = str(c)
+        if name.startswith('Unnamed:'):
+            unnamed += 1
+        elif _NUMERIC_NAME(name):
+            numeric += 1
+        elif not name.strip():
+            empty += 1
+    return unnamed, numeric, empty
+
+def _is_empty_cell(value):
+    return value is None or value == '' or (isinstance(value, float) and np.isnan(value))
+
+def _is_blank_line(row):
+    # The rows pandas itself skips after skiprows: empty lines, or a single
+    # whitespace-only field. ',,,' and rows of empty Excel cells are kept
+    # and become a header of 'Unnamed: N' columns.
+    return not row or (len(row) == 1 and isinstance(row[0], str) and not row[0].strip())
+
+def detect_header_row(rows, max_rows_to_check=HEADER_CHECK_ROWS):
+    """
+    Automatically detect header row by checking the first few probed rows.
+    Returns the skiprows value (0 if headers are in first row) and the
+    header, or (0, None) if no row looks like one.
+    """
+    for skip, row in enumerate(rows[:max_rows_to_check]):
+        cols = [f'Unnamed: {i}' if _is_empty_cell(c) else c for i, c in enumerate(row)]
+        n = len(cols)
+        unnamed_count, numeric_count, empty_count = classify_header_names(cols)
+        text_count = n - unnamed_count - numeric_count - empty_count
+        if n > 3 and text_count > n * 0.5 and (unnamed_count + numeric_count) < n * 0.3:
+            return skip, cols
     return 0, None
 
+def resolve_columns(rows, skiprows, columns):
+    """
+    Map requested column names, matched case-insensitively, to the names in
+    the probed header row so they can be passed to the reader as usecols.
+    The header is the row pandas reads under the same skiprows: the first
+    one after them that _is_blank_line doesn't drop. Returns None when a
+    name is missing or ambiguous; callers then read every column.
+    """
+    rows = rows[skiprows or 0:][:HEADER_CHECK_ROWS]
+    header = next((r for r in rows if not _is_blank_line(r)), [])
+    names = {}
+    for c in header:
+        if isinstance(c, str):
+            names.setdefault(c.strip().lower(), []).append(c)
+    resolved = []
+    for column in columns:
+        matches = names.get(column.strip().lower(), [])
+        if len(matches) != 1:
+            return None
+        resolved.append(matches[0])
+    return resolved
+
+def read_header_preview(fh, file_name, skip_rows, auto_detect, sheet_name=0):
+    """
+    Read the first rows of a file under its header, detecting the header row
+    first when asked to. Returns (df, skip_rows_used).
+    """
+    book = None if file_name.lower().endswith('.csv') else open_workbook(fh)
+    if auto_detect and skip_rows is None:
+        skip_rows, _ = detect_header_row(read_header_probe(fh, HEADER_CHECK_ROWS,
+                                                           book, sheet_name))
+    if skip_rows is None:
+        skip_rows = 0
+
+    if book is not None:
+        df = parse_workbook(book, sheet_name, skiprows=skip_rows, nrows=5)
+    else:
+        fh.seek(0)
+        df = pd.read_csv(fh, skiprows=skip_rows, nrows=5)
+    return df, skip_rows
+
+def categorize_columns(df):
+    """
+    Convert low-cardinality text columns to the category dtype in place, so
+    counting and grouping work on integer codes instead of hashing strings.
+    """
+    for col in df.columns:
+        if df[col].dtype == object and df[col].nunique() < len(df) // 10:
+            df[col] = df[col].astype('category')
+    return df
+
+def get_file_metadata(service, file_id):
+    """
+    Cheap metadata call used to tell whether a file changed since it was last parsed.
+    """
+    return service.files().get(fileId=file_id,
+                               fields='id,name,modifiedTime,md5Checksum').execute()
+
+def fetch_file_metadata(service, file):
+    """
+    Metadata for a file from find_file_by_name; a fresh lookup already has it.
+    """
+    return file if 'modifiedTime' in file else get_file_metadata(service, file['id'])
+
+def _parquet_cache_prefix(md5, cache_args):
+    digest = hashlib.sha1(repr(cache_args).encode()).hexdigest()[:16]
+    return os.path.join(PARQUET_CACHE_DIR, f"{md5}-{digest}")
+
+def read_parquet_cache(prefix):
+    """
+    Load sheets previously written by write_parquet_cache, or None if they are not on disk.
+    """
+    manifest_path = prefix + '.json'
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        result = {}
+        for i, sheet in enumerate(manifest['sheets']):
+            result[sheet] = pd.read_parquet(f"{prefix}-{i}.parquet", memory_map=True)
+        if 'metadata' in manifest:
+            result['_metadata'] = manifest['metadata']
+        # Pruning goes by mtime, so a hit marks the entry as recently used.
+        os.utime(manifest_path)
+        return result
+    except Exception:
+        return None
+
+def write_parquet_cache(prefix, result):
+    """
+    Persist parsed sheets as zstd Parquet so a restarted worker can skip the
+    download and parse. Best effort: frames Parquet cannot represent
+    (e.g. non-string column names) are simply not persisted.
+    """
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(PARQUET_CACHE_DIR, exist_ok=True)
+        sheets = [name for name in result if name != '_metadata']
+        for i, sheet in enumerate(sheets):
+            path = f"{prefix}-{i}.parquet"
+            result[sheet].to_parquet(path + suffix, compression='zstd')
+            os.replace(path + suffix, path)
+        manifest = {'sheets': sheets}
+        if '_metadata' in result:
+            manifest['metadata'] = result['_metadata']
+        # The manifest is written last, so its presence means every sheet is on disk.
+        with open(prefix + '.json' + suffix, 'w') as f:
+            json.dump(manifest, f, default=str)
+        os.replace(prefix + '.json' + suffix, prefix + '.json')
+        prune_parquet_cache()
+    except Exception:
+        pass
+
+def prune_parquet_cache(max_bytes=PARQUET_CACHE_MAX_BYTES):
+    """
+    Delete the least recently used entries in PARQUET_CACHE_DIR until its
+    files total at most max_bytes. An entry's manifest is removed before its
+    Parquet files, so readers never see half an entry.
+    """
+    entries = {}
+    with os.scandir(PARQUET_CACHE_DIR) as it:
+        for f in it:
+            if f.name.endswith('.json'):
+                prefix = f.name[:-len('.json')]
+            elif f.name.endswith('.parquet'):
+                prefix = f.name.rsplit('-', 1)[0]
+            else:
+                # Temporary files of writes still in progress.
+                continue
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            entry = entries.setdefault(prefix, [0, 0.0, []])
+            entry[0] += st.st_size
+            entry[1] = max(entry[1], st.st_mtime)
+            entry[2].append(f.path)
+    total = sum(size for size, _, _ in entries.values())
+    for size, _, paths in sorted(entries.values(), key=lambda e: e[1]):
+        if total <= max_bytes:
+            break
+        for path in sorted(paths, key=lambda p: not p.endswith('.json')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+
+def _cache_get(cache, key):
+    with _DATAFRAME_CACHE_LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache, max_size, key, value):
+    with _DATAFRAME_CACHE_LOCK:
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+def forget_file(file_name, file_id):
+    """
+    Drop the cached id and query results for a file Drive no longer serves
+    under file_id, so the next lookup resolves the name again. Parsed
+    DataFrames are keyed by content and cannot go stale, so they are kept.
+    """
+    with _DATAFRAME_CACHE_LOCK:
+        _FILE_ID_CACHE.pop(file_name, None)
+        for key in [k for k in _QUERY_RESULT_CACHE if k[0] == file_id]:
+            del _QUERY_RESULT_CACHE[key]
+
+def _evict_frames():
+    """
+    Evict the oldest cached frames until the cache is within its entry count
+    and its byte budget, which covers date indexes too. Date indexes built
+    on an evicted frame are dropped with it, so the frame's memory is
+    actually released. Callers hold _DATAFRAME_CACHE_LOCK.
+    """
+    evicted = set()
+    while len(_DATAFRAME_CACHE) > 1 and (
+            len(_DATAFRAME_CACHE) > _DATAFRAME_CACHE_SIZE
+            or sum(_DATAFRAME_CACHE_NBYTES.values())
+            + sum(_DATE_INDEX_CACHE_NBYTES.values()) > _DATAFRAME_CACHE_MAX_BYTES):
+        old_key, old = _DATAFRAME_CACHE.popitem(last=False)
+        del _DATAFRAME_CACHE_NBYTES[old_key]
+        evicted.update(id(df) for name, df in old.items() if name != '_metadata')
+    for k in [k for k in _DATE_INDEX_CACHE if k[0] in evicted]:
+        del _DATE_INDEX_CACHE[k]
+        _DATE_INDEX_CACHE_NBYTES.pop(k, None)
+
+def _cache_put_frames(key, result):
+    """
+    _cache_put for _DATAFRAME_CACHE, bounded by both entry count and the
+    estimated bytes of the cached frames.
+    """
+    nbytes = sum(int(df.memory_usage(index=True, deep=True).sum())
+                 for name, df in result.items() if name != '_metadata')
+    with _DATAFRAME_CACHE_LOCK:
+        _DATAFRAME_CACHE[key] = result
+        _DATAFRAME_CACHE.move_to_end(key)
+        _DATAFRAME_CACHE_NBYTES[key] = nbytes
+        _evict_frames()
+
+def _cache_put_date_index(key, entry):
+    """
+    _cache_put for _DATE_INDEX_CACHE, charging each index's bytes to the
+    DataFrame cache budget. Only indexes of frames still in the DataFrame
+    cache are kept; one on an evicted frame would keep it alive uncounted.
+    """
+    df, date_index, _ = entry
+    nbytes = 0 if date_index is None else int(date_index.memory_usage(index=True))
+    with _DATAFRAME_CACHE_LOCK:
+        if not any(frame is df for result in _DATAFRAME_CACHE.values()
+                   for frame in result.values()):
+            return
+        _DATE_INDEX_CACHE[key] = entry
+        _DATE_INDEX_CACHE.move_to_end(key)
+        _DATE_INDEX_CACHE_NBYTES[key] = nbytes
+        while len(_DATE_INDEX_CACHE) > _DATE_INDEX_CACHE_SIZE:
+            old_key, _ = _DATE_INDEX_CACHE.popitem(last=False)
+            _DATE_INDEX_CACHE_NBYTES.pop(old_key, None)
+        _evict_frames()
+
 def load_dataframe_from_drive(service, file_id, file_name,
                               usecols=None, parse_dates=None,
-                              skiprows=None, auto_detect=False):
-    request_media = service.files().get_media(fileId=file_id)
-    content = request_media.execute()
+                              skiprows=None, auto_detect=False, file_meta=None,
+                              columns=None, sheet_name=None):
+    """
+    Download and parse a Drive file into a {sheet_name: DataFrame} dict.
+    Parsed results are cached by content (md5Checksum), in memory and as
+    Parquet on disk, so a renamed or re-uploaded copy of the same bytes is
+    not parsed again; callers must not mutate the DataFrames. Pass file_meta when the
+    caller already fetched it with get_file_metadata. columns limits the read
+    to those names, matched case-insensitively against the header row; if
+    any of them can't be matched, every column is read. sheet_name picks a
+    single Excel sheet (name or position) to parse; None parses them all.
+    """
+    meta = file_meta or get_file_metadata(service, file_id)
+    # Only the extension of the name affects how the bytes are parsed.
+    parse_args = (os.path.splitext(file_name)[1].lower(),
+                  tuple(usecols) if usecols else None,
+                  tuple(parse_dates) if parse_dates else None,
+                  skiprows, auto_detect,
+                  # Columns are matched case-insensitively, so they are
+                  # keyed that way too.
+                  tuple(c.strip().lower() for c in columns) if columns else None,
+                  sheet_name)
+    # Native Google Docs have no md5Checksum; their version is the modifiedTime.
+    content_key = meta.get('md5Checksum') or (file_id, meta.get('modifiedTime'))
+    cache_key = (content_key,) + parse_args
+    cached = _cache_get(_DATAFRAME_CACHE, cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    # Native Google Docs have no md5Checksum and are not persisted.
+    parquet_prefix = None
+    if meta.get('md5Checksum'):
+        parquet_prefix = _parquet_cache_prefix(meta['md5Checksum'], parse_args)
+        result = read_parquet_cache(parquet_prefix)
+        if result is not None:
+            _cache_put_frames(cache_key, result)
+            return dict(result)
+
     detected_skip = None
     detected_cols = None
-    if auto_detect and skiprows is None:
-        detected_skip, detected_cols = detect_header_row(content, file_name)
-        skiprows = detected_skip
-    if file_name.lower().endswith('.csv'):
-        df = pd.read_csv(io.BytesIO(content),
-                         usecols=usecols,
-                         parse_dates=parse_dates,
-                         skiprows=skiprows)
-        result = {'Sheet1': df}
-    else:
-        try:
-            df_sheets = pd.read_excel(io.BytesIO(content),
-                                      sheet_name=None,
-                                      engine='openpyxl',
-                                      usecols=usecols,
-                                      skiprows=skiprows)
-            result = df_sheets
-        except Exception:
-            df = pd.read_csv(io.BytesIO(content),
-                             usecols=usecols,
-                             parse_dates=parse_dates,
-                             skiprows=skiprows)
+    with download_file(service, file_id) as fh:
+        # Only a file that doesn't open as a workbook is read as CSV; a
+        # missing sheet raises SheetNotFoundError.
+        book = None if file_name.lower().endswith('.csv') else open_workbook(fh)
+        detecting = auto_detect and skiprows is None
+        if detecting or columns:
+            # One probe covers every header candidate and the rows under
+            # whichever one is chosen.
+            skip_bound = HEADER_CHECK_ROWS - 1 if detecting else skiprows or 0
+            rows = read_header_probe(fh, skip_bound + HEADER_CHECK_ROWS, book, sheet_name or 0)
+        if detecting:
+            detected_skip, detected_cols = detect_header_row(rows)
+            skiprows = detected_skip
+        excel_usecols = usecols
+        resolved = None
+        if columns:
+            resolved = resolve_columns(rows, skiprows, columns)
+            if resolved:
+                usecols = resolved
+                # Other sheets may not have these columns; a callable skips
+                # them instead of raising.
+                excel_usecols = lambda c, keep=frozenset(resolved): c in keep
+        if book is not None:
+            result = parse_workbook(book,
+                                    sheet_name=None if sheet_name is None else [sheet_name],
+                                    usecols=excel_usecols,
+                                    skiprows=skiprows)
+        else:
+            try:
+                df = read_csv_file(fh,
+                                   usecols=usecols,
+                                   parse_dates=parse_dates,
+                                   skiprows=skiprows)
+            except ValueError:
+                if not resolved:
+                    raise
+                # The header pandas read doesn't have the resolved names;
+                # read every column so the caller can report what is there.
+                df = read_csv_file(fh,
+                                   usecols=None,
+                                   parse_dates=parse_dates,
+                                   skiprows=skiprows)
             result = {'Sheet1': df}
+    for df in result.values():
+        categorize_columns(df)
     if auto_detect:
         result['_metadata'] = {
             'auto_detected_skiprows': detected_skip,
             'detected_columns': detected_cols
         }
-    return result
+    if parquet_prefix:
+        write_parquet_cache(parquet_prefix, result)
+    _cache_put_frames(cache_key, result)
+    return dict(result)
+
+def date_sample(values):
+    """
+    Up to DATE_SAMPLE_SIZE non-null values spread evenly over the column, so a
+    date-sorted file is sampled across its whole range rather than its head.
+    """
+    valid = values.dropna()
+    if len(valid) <= DATE_SAMPLE_SIZE:
+        return valid
+    positions = np.linspace(0, len(valid) - 1, DATE_SAMPLE_SIZE).astype(np.intp)
+    return valid.iloc[positions]
+
+def choose_date_strategy(sample):
+    """
+    Return the to_datetime keyword arguments of the first DATE_STRATEGIES
+    entry that parses most of the sample.
+    """
+    for i, kwargs in enumerate(DATE_STRATEGIES):
+        invalid = pd.to_datetime(sample, errors='coerce', **kwargs).isna().sum()
+        # Inference and dayfirst are kept unless most values fail;
+        # explicit formats must parse most values.
+        ok = invalid <= len(sample) * 0.5 if i < 2 else invalid < len(sample) * 0.5
+        if ok:
+            return kwargs
+    return DATE_STRATEGIES[-1]
+
+def prefetch_file(file_name, columns, skip_rows, auto_detect, sheet_name):
+    """
+    Resolve, download and parse one file into the DataFrame cache with the
+    same arguments /query uses. Runs on _DRIVE_EXECUTOR threads, each with
+    its own Drive service. Returns the file's /prefetch entry.
+    """
+    service = get_drive_service()
+    if not service:
+        return {"name": file_name, "error": "Could not authenticate with Google Drive."}
+    try:
+        meta, err = with_drive_file(service, file_name,
+                                    lambda file: fetch_file_metadata(service, file))
+        if err:
+            return {"name": file_name, "error": err}
+        load_dataframe_from_drive(service, meta['id'], meta.get('name', file_name),
+                                  skiprows=skip_rows, auto_detect=auto_detect,
+                                  file_meta=meta, columns=columns, sheet_name=sheet_name)
+    except Exception as ex:
+        return {"name": file_name, "error": f"Could not load file: {str(ex)}"}
+    return {"name": file_name, "id": meta['id']}
+
+def parse_skip_rows(args):
+    """
+    Read autoDetect and skipRows from request args; an integer skipRows
+    turns auto-detection off. Returns (skip_rows, auto_detect).
+    """
+    auto_detect = args.get('autoDetect', 'true').lower() == 'true'
+    skip_rows = args.get('skipRows', None)
+    if skip_rows is not None:
+        try:
+            skip_rows = int(skip_rows)
+            auto_detect = False
+        except:
+            skip_rows = None
+    return skip_rows, auto_detect
+
+def parse_date_column(values, date_format=None):
+    """
+    Parse a raw date column, falling back to day-first and explicit formats
+    when most values fail to parse. The strategy is chosen on a sample spread
+    over the column, and the others are retried on the full column only if it
+    fails there; a given date_format skips the sampling.
+    Returns (parsed, error).
+    """
+    col = values.name
+    try:
+        if date_format:
+            strategy = {'format': date_format}
+        else:
+            strategy = choose_date_strategy(date_sample(values))
+        parsed = pd.to_datetime(values, errors='coerce', **strategy)
+        if not date_format and parsed.isna().sum() > len(parsed) * 0.5:
+            # The sample can mislead (e.g. every sampled day <= 12); fall back
+            # to trying the other strategies on the full column.
+            for kwargs in DATE_STRATEGIES:
+                if kwargs is strategy:
+                    continue
+                candidate = pd.to_datetime(values, errors='coerce', **kwargs)
+                if candidate.isna().sum() <= len(candidate) * 0.5:
+                    parsed = candidate
+                    break
+        invalid_count = parsed.isna().sum()
+        if invalid_count > len(parsed) * 0.5:
+            return None, f"Could not parse date column '{col}': Too many invalid dates ({invalid_count}/{len(parsed)}). Sample values: {parsed.head(3).tolist()}"
+    except Exception as e:
+        return None, f"Could not parse date column '{col}': {str(e)}"
+    return parsed, None
+
+def get_date_index(df, date_col, date_format=None):
+    """
+    Parse df[date_col] once per cached frame and keep the valid dates sorted.
+    Returns (Series of row positions in df indexed by a sorted DatetimeIndex, error),
+    so a date range can be selected by binary search instead of a full scan.
+    """
+    key = (id(df), date_col, date_format)
+    entry = _cache_get(_DATE_INDEX_CACHE, key)
+    # The entry holds a reference to df, so its id cannot be reused while cached.
+    if entry is not None and entry[0] is df:
+        return entry[1], entry[2]
+
+    parsed, error = parse_date_column(df[date_col], date_format)
+    date_index = None
+    if parsed is not None:
+        valid = parsed.notna().to_numpy()
+        dates = pd.DatetimeIndex(parsed[valid])
+        order = np.argsort(dates.asi8, kind='stable')
+        date_index = pd.Series(np.flatnonzero(valid)[order], index=dates[order])
+
+    _cache_put_date_index(key, (df, date_index, error))
+    return date_index, error
+
+def count_groups(column, rows):
+    """
+    Count the rows at positions `rows` per distinct value of `column`, ignoring missing values.
+    Categorical columns are counted with np.bincount over their integer codes.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+        present = np.flatnonzero(counts)
+        return dict(zip(column.cat.categories[present].tolist(), counts[present].tolist()))
+    return column.iloc[rows].value_counts(sort=False).to_dict()
+
+@lru_cache(maxsize=1)
+def last_completed_quarter(today):
+    """
+    Return (start, end) dates of the last calendar quarter completed before today.
+    Memoized for the current day, since every request in a day asks for the same one.
+    """
+    q = (today.month - 1) // 3
+    if q == 0:
+        year, end_month = today.year - 1, 12
+    else:
+        year, end_month = today.year, q * 3
+    return date(year, end_month - 2, 1), date(year, end_month, _QUARTER_END_DAY[end_month])
 
 @app.route('/')
 def index():
@@ -128,26 +875,56 @@ def index():
 
 @app.route('/files', methods=['GET'])
 def list_files():
-    if not load_credentials_from_env():
+    if not _CREDENTIALS_READY:
         return jsonify({"error": "Server is not configured with Google credentials."}), 500
     service = get_drive_service()
     if not service:
         return jsonify({"error": "Could not authenticate with Google Drive."}), 500
+    names = request.args.get('names')
+    if names:
+        # Resolve several names in one call; lookups run concurrently.
+        file_names = [n.strip() for n in names.split(',') if n.strip()]
+        file_list = []
+        for name, (file_id, err) in zip(file_names, _DRIVE_EXECUTOR.map(resolve_file_name, file_names)):
+            file_list.append({"name": name, "error": err} if err else {"name": name, "id": file_id})
+        return jsonify({"files": file_list})
     try:
         results = service.files().list(pageSize=20,
+                                       pageToken=request.args.get('pageToken'),
                                        fields="nextPageToken, files(id, name, mimeType)").execute()
         items = results.get('files', [])
         if not items:
             return jsonify({"message": "No files found."})
         file_list = [{"name": item['name'], "id": item['id'], "type": item['mimeType']}
                      for item in items]
-        return jsonify({"files": file_list})
+        response = {"files": file_list}
+        if results.get('nextPageToken'):
+            response["nextPageToken"] = results['nextPageToken']
+        return jsonify(response)
     except HttpError as error:
         return jsonify({"error": str(error)}), 500
 
+def preview_drive_file(service, file, skip_rows, auto_detect, sheet_name=0):
+    """
+    read_header_preview for a Drive file. A CSV is previewed from a ranged
+    read of its first bytes when that is enough; anything else is
+    downloaded whole. Returns (DataFrame, skip_rows_used).
+    """
+    file_name = file.get('name', '')
+    if file_name.lower().endswith('.csv'):
+        head = download_file_head(service, file['id'])
+        if head is not None:
+            try:
+                return read_header_preview(head, file_name, skip_rows, auto_detect, sheet_name)
+            except Exception:
+                # e.g. a quoted field cut off by the range; use the whole file.
+                pass
+    with download_file(service, file['id']) as fh:
+        return read_header_preview(fh, file_name, skip_rows, auto_detect, sheet_name)
+
 @app.route('/check_headers', methods=['GET'])
 def check_headers():
-    if not load_credentials_from_env():
+    if not _CREDENTIALS_READY:
         return jsonify({"error": "Server is not configured with Google credentials."}), 500
     service = get_drive_service()
     if not service:
@@ -157,45 +934,25 @@ def check_headers():
     if not file_name:
         return jsonify({"error": "You must provide a 'fileName' parameter."}), 400
 
-    auto_detect = request.args.get('autoDetect', 'true').lower() == 'true'
-    skip_rows = request.args.get('skipRows', None)
-    if skip_rows is not None:
-        try:
-            skip_rows = int(skip_rows)
-            auto_detect = False
-        except:
-            skip_rows = None
+    skip_rows, auto_detect = parse_skip_rows(request.args)
 
-    file_id, err = find_file_id_by_name(service, file_name)
-    if err:
-        return jsonify({"error": err}), 404
+    sheet_name = parse_sheet_name(request.args)
 
+    was_auto = auto_detect and skip_rows is None
     try:
-        content = service.files().get_media(fileId=file_id).execute()
-        if auto_detect and skip_rows is None:
-            detected_skip, detected_cols = detect_header_row(content, file_name)
-            skip_rows = detected_skip
-            was_auto = True
-        else:
-            detected_cols = None
-            was_auto = False
-        if skip_rows is None:
-            skip_rows = 0
-
-        if file_name.lower().endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content), skiprows=skip_rows, nrows=5)
-        else:
-            try:
-                df = pd.read_excel(io.BytesIO(content), sheet_name=0,
-                                   engine='openpyxl', skiprows=skip_rows, nrows=5)
-            except:
-                df = pd.read_csv(io.BytesIO(content), skiprows=skip_rows, nrows=5)
+        preview, err = with_drive_file(
+            service, file_name,
+            lambda file: preview_drive_file(service, file, skip_rows, auto_detect, sheet_name),
+            request.args.get('mode') == 'prefix')
+        if err:
+            return jsonify({"error": err}), 404
+        df, skip_rows = preview
 
         cols = df.columns.tolist()
-        unnamed_count = sum(1 for c in cols if str(c).startswith('Unnamed:'))
-        numeric_count = sum(1 for c in cols if str(c).replace('.', '').replace('-', '').isdigit())
+        unnamed_count, numeric_count, _ = classify_header_names(cols)
         warning = None
-        if unnamed_count > len(cols) * 0.3 or numeric_count > len(cols) * 0.3:
+        limit = len(cols) * 0.3
+        if unnamed_count > limit or numeric_count > limit:
             warning = f"Warning: Many columns appear unnamed or numeric at row {skip_rows}. Headers may be in a different row."
 
         preview = df.head(3).to_dict('records')
@@ -212,12 +969,14 @@ def check_headers():
 
         return jsonify(result)
 
+    except SheetNotFoundError as ex:
+        return jsonify({"error": str(ex)}), 400
     except Exception as ex:
         return jsonify({"error": f"Could not load file to inspect headers: {str(ex)}"}), 500
 
 @app.route('/query', methods=['GET'])
 def query_data():
-    if not load_credentials_from_env():
+    if not _CREDENTIALS_READY:
         return jsonify({"error": "Server is not configured with Google credentials."}), 500
     service = get_drive_service()
     if not service:
@@ -227,39 +986,57 @@ def query_data():
     if not file_name_to_query:
         return jsonify({"error": "You must provide a 'fileName' parameter."}), 400
 
-    file_id, error = find_file_id_by_name(service, file_name_to_query)
+    # Repeat queries against an unchanged file are answered from the cached
+    # body, keyed by the file's metadata.
+    file_meta, error = with_drive_file(service, file_name_to_query,
+                                       lambda file: fetch_file_metadata(service, file),
+                                       request.args.get('mode') == 'prefix')
     if error:
         return jsonify({"error": error}), 404
+    file_id = file_meta['id']
+    # Parse by the matched file's own name, which carries its extension.
+    file_name_to_query = file_meta.get('name', file_name_to_query)
 
     query_params = request.args
     requested_date_col_raw = query_params.get('dateColumn', 'OrdDate')
     requested_group_by_raw = query_params.get('groupBy', 'SOType')
+    # Only one sheet is ever counted, so only that one is parsed.
+    sheet_name = parse_sheet_name(query_params)
+    date_format = query_params.get('dateFormat') or None
 
-    auto_detect = query_params.get('autoDetect', 'true').lower() == 'true'
-    skip_rows = query_params.get('skipRows', None)
-    if skip_rows is not None:
-        try:
-            skip_rows = int(skip_rows)
-            auto_detect = False
-        except:
-            skip_rows = None
+    skip_rows, auto_detect = parse_skip_rows(query_params)
 
-    sheets = load_dataframe_from_drive(
-        service,
-        file_id,
-        file_name_to_query,
-        usecols=None,
-        parse_dates=None,
-        skiprows=skip_rows,
-        auto_detect=auto_detect
-    )
+    req_date_key = requested_date_col_raw.strip().lower()
+    req_group_key = requested_group_by_raw.strip().lower()
+    quarter_start, quarter_end = last_completed_quarter(date.today())
+
+    result_key = (file_id, file_meta.get('modifiedTime'), file_name_to_query,
+                  skip_rows, auto_detect, req_date_key, req_group_key, quarter_start,
+                  sheet_name, date_format)
+    body = _cache_get(_QUERY_RESULT_CACHE, result_key)
+    if body is not None:
+        return app.response_class(body, mimetype=app.json.mimetype)
+
+    try:
+        sheets = load_dataframe_from_drive(
+            service,
+            file_id,
+            file_name_to_query,
+            usecols=None,
+            parse_dates=None,
+            skiprows=skip_rows,
+            auto_detect=auto_detect,
+            file_meta=file_meta,
+            columns=[requested_date_col_raw, requested_group_by_raw],
+            sheet_name=sheet_name
+        )
+    except SheetNotFoundError as ex:
+        return jsonify({"error": str(ex)}), 400
     metadata = sheets.pop('_metadata', None)
-    df = next(iter(sheets.values())).copy()
+    df = next(iter(sheets.values()))
 
     cols = df.columns.tolist()
     norm = {c.strip().lower(): c for c in cols}
-    req_date_key = requested_date_col_raw.strip().lower()
-    req_group_key = requested_group_by_raw.strip().lower()
     if req_date_key not in norm or req_group_key not in norm:
         error_msg = f"Could not find required columns. Available: {cols}"
         if metadata:
@@ -269,66 +1046,62 @@ def query_data():
     date_col = norm[req_date_key]
     group_by = norm[req_group_key]
 
-    df = df[[date_col, group_by]].copy()
-
-    try:
-        df[date_col] = pd.to_datetime(df[date_col], infer_datetime_format=True, errors='coerce')
-        # fallback dayfirst if too many invalids
-        if df[date_col].isna().sum() > len(df) * 0.5:
-            df[date_col] = pd.to_datetime(df[date_col], dayfirst=True, errors='coerce')
-        if df[date_col].isna().sum() > len(df) * 0.5:
-            for fmt in ['%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d', '%d-%m-%Y']:
-                try:
-                    df[date_col] = pd.to_datetime(df[date_key], format=fmt, errors='coerce')
-                    if df[date_col].isna().sum() < len(df) * 0.5:
-                        break
-                except Exception:
-                    continue
-        invalid_count = df[date_col].isna().sum()
-        if invalid_count > len(df) * 0.5:
-            return jsonify({"error": f"Could not parse date column '{date_col}': Too many invalid dates ({invalid_count}/{len(df)}). Sample values: {df[date_col].head(3).tolist()}"}), 400
-    except Exception as e:
-        return jsonify({"error": f"Could not parse date column '{date_col}': {str(e)}"}), 400
-
-    df = df[df[date_col].notna()].copy()
-    if df.empty:
+    date_index, error = get_date_index(df, date_col, date_format)
+    if error:
+        return jsonify({"error": error}), 400
+    if date_index.empty:
         return jsonify({"error": "No valid dates found in the date column after parsing"}), 400
 
-    today = date.today()
-    # Compute the start & end of last completed quarter:
-    if today.month <= 3:
-        quarter_start = date(today.year - 1, 10, 1)
-        quarter_end = date(today.year - 1, 12, 31)
-    else:
-        q = ((today.month - 1) // 3)
-        start_month = q * 3 - 2
-        quarter_start = date(today.year, start_month, 1)
-        if start_month + 2 == 12:
-            quarter_end = date(today.year, 12, 31)
-        else:
-            next_month = date(today.year, start_month + 3, 1)
-            quarter_end = next_month - timedelta(days=1)
-
-    mask = (df[date_col].dt.date >= quarter_start) & (df[date_col].dt.date <= quarter_end)
-    df_q = df.loc[mask]
+    # Two binary searches on the sorted dates give the quarter as one
+    # positional slice; no per-row boolean mask is built.
+    dates = date_index.index
+    lo = pd.Timestamp(quarter_start).tz_localize(dates.tz)
+    hi = pd.Timestamp(quarter_end).tz_localize(dates.tz) + pd.Timedelta(days=1)
+    start, stop = dates.searchsorted([lo, hi], side='left')
+    rows = date_index.to_numpy()[start:stop]
 
-    result_counts = df_q.groupby(group_by).size().to_dict()
+    result_counts = count_groups(df[group_by], rows)
 
     response = {
         "data": result_counts,
         "metadata": {
             "quarterStart": quarter_start.isoformat(),
             "quarterEnd": quarter_end.isoformat(),
-            "totalRecords": len(df_q),
-            "totalRecordsBeforeFilter": len(df),
+            "totalRecords": len(rows),
+            "totalRecordsBeforeFilter": len(date_index),
             "dateColumn": date_col,
             "groupByColumn": group_by,
-            "dateFormat": "auto-detected"
+            "dateFormat": date_format or "auto-detected"
         }
     }
     if metadata:
         response["metadata"]["autoDetectedSkipRows"] = metadata.get('auto_detected_skiprows')
-    return jsonify(response)
+    resp = jsonify(response)
+    _cache_put(_QUERY_RESULT_CACHE, _QUERY_RESULT_CACHE_SIZE, result_key, resp.get_data())
+    return resp
+
+@app.route('/prefetch', methods=['GET'])
+def prefetch():
+    if not _CREDENTIALS_READY:
+        return jsonify({"error": "Server is not configured with Google credentials."}), 500
+    names = request.args.get('fileNames')
+    if not names:
+        return jsonify({"error": "You must provide a 'fileNames' parameter."}), 400
+
+    # Warm the cache for the /query calls that will follow; takes the same
+    # dateColumn, groupBy, skipRows, autoDetect and sheetName parameters.
+    file_names = [n.strip() for n in names.split(',') if n.strip()]
+    columns = [request.args.get('dateColumn', 'OrdDate'), request.args.get('groupBy', 'SOType')]
+    skip_rows, auto_detect = parse_skip_rows(request.args)
+    sheet_name = parse_sheet_name(request.args)
+    results = _DRIVE_EXECUTOR.map(
+        lambda name: prefetch_file(name, columns, skip_rows, auto_detect, sheet_name),
+        file_names)
+    return jsonify({"files": list(results)})
+
+# Materialise credentials from the environment once per process, not per request.
+_CREDENTIALS_READY = load_credentials_from_env()
 
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
+    # Local runs only; set FLASK_DEBUG=1 for the debugger and reloader.
+    app.run(port=5000)
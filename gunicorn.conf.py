@@ -0,0 +1,14 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+Drive calls are I/O bound, so each worker serves requests from a pool of
+threads; WEB_CONCURRENCY sets the number of worker processes.
+"""
+import os
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+threads = 8
+# Large workbooks can take longer than gunicorn's default 30 s to download and parse.
+timeout = 120
+# Import the app once in the master; workers fork with it already loaded.
+preload_app = True
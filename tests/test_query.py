@@ -0,0 +1,166 @@
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+import urllib.parse
+from datetime import date, timedelta
+from unittest import mock
+
+import httplib2
+import pandas as pd
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+class FakeDriveHttp:
+    """
+    Just enough of the Drive v3 REST API for the app: name search, metadata
+    and (ranged) media downloads of the files in `files`.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.credentials = None
+
+    def add_file(self, file_id, name, content):
+        self.files[file_id] = {'id': file_id, 'name': name, 'content': content,
+                               'modifiedTime': '2026-01-01T00:00:00Z',
+                               'md5Checksum': hashlib.md5(content).hexdigest()}
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        url = urllib.parse.urlparse(uri)
+        qs = urllib.parse.parse_qs(url.query)
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+        def respond(status, content, content_type='application/json', **extra):
+            return httplib2.Response(dict(status=str(status), **{'content-type': content_type}, **extra)), content
+
+        def meta(f):
+            return {k: v for k, v in f.items() if k != 'content'}
+
+        if url.path.endswith('/drive/v3/files'):
+            items = list(self.files.values())
+            m = re.search(r"name (=|contains) '((?:[^'\\]|\\.)*)'", qs.get('q', [''])[0])
+            if m:
+                value = re.sub(r'\\(.)', r'\1', m.group(2))
+                items = [f for f in items
+                         if (f['name'] == value if m.group(1) == '=' else value in f['name'])]
+            page_size = int(qs.get('pageSize', ['100'])[0])
+            return respond(200, json.dumps({'files': [meta(f) for f in items[:page_size]]}).encode())
+
+        m = re.match(r'.*/drive/v3/files/([^/]+)$', url.path)
+        f = self.files.get(m.group(1)) if m else None
+        if f is None:
+            return respond(404, b'{"error": {"code": 404, "message": "File not found"}}')
+        if qs.get('alt') != ['media']:
+            return respond(200, json.dumps(meta(f)).encode())
+        data = f['content']
+        if 'range' in headers:
+            start, end = (int(x) for x in headers['range'].split('=')[1].split('-'))
+            end = min(end, len(data) - 1)
+            return respond(206, data[start:end + 1], 'application/octet-stream',
+                           **{'content-range': f'bytes {start}-{end}/{len(data)}'})
+        return respond(200, data, 'application/octet-stream')
+
+
+def last_completed_quarter(today):
+    start_month = ((today.month - 1) // 3) * 3 + 1
+    end = date(today.year, start_month, 1) - timedelta(days=1)
+    return date(end.year, end.month - 2, 1), end
+
+
+class QueryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.drive = FakeDriveHttp()
+        service = build('drive', 'v3', http=self.drive, static_discovery=True, cache_discovery=False)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        for name, value in [('get_drive_service', lambda: service),
+                            ('load_credentials_from_env', lambda: True),
+                            ('_CREDENTIALS_READY', True),
+                            ('PARQUET_CACHE_DIR', cache_dir.name)]:
+            patcher = mock.patch.object(app, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for name in dir(app):
+            value = getattr(app, name)
+            if name.startswith('_') and 'CACHE' in name and isinstance(value, dict):
+                value.clear()
+        self.client = app.app.test_client()
+
+    def low_cardinality_rows(self):
+        # 3000 rows over 281 dates: the date column is below the len/10
+        # distinct values that makes it categorical.
+        today = date.today()
+        return [((today - timedelta(days=i % 281)).isoformat(), 'ABC'[i % 3])
+                for i in range(3000)]
+
+    def expected_counts(self, rows):
+        start, end = last_completed_quarter(date.today())
+        counts = {}
+        for day, so_type in rows:
+            if start.isoformat() <= day <= end.isoformat():
+                counts[so_type] = counts.get(so_type, 0) + 1
+        return counts
+
+    def test_low_cardinality_date_column_csv(self):
+        rows = self.low_cardinality_rows()
+        csv = 'OrdDate,SOType\n' + ''.join(f'{d},{t}\n' for d, t in rows)
+        self.drive.add_file('f1', 'orders.csv', csv.encode())
+
+        response = self.client.get('/query?fileName=orders.csv')
+
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertEqual(response.get_json()['data'], self.expected_counts(rows))
+
+    def test_low_cardinality_date_column_xlsx(self):
+        rows = self.low_cardinality_rows()
+        buf = io.BytesIO()
+        pd.DataFrame(rows, columns=['OrdDate', 'SOType']).to_excel(buf, index=False)
+        self.drive.add_file('f1', 'orders.xlsx', buf.getvalue())
+
+        response = self.client.get('/query?fileName=orders.xlsx')
+
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertEqual(response.get_json()['data'], self.expected_counts(rows))
+
+    def test_comma_only_row_after_skip_is_the_header(self):
+        # pandas reads ',,,' as a header of 'Unnamed: N' columns, not as a
+        # blank line to skip, so the requested columns are not there.
+        rows = self.low_cardinality_rows()
+        csv = 'Report title,,,\n,,,\nOrdDate,SOType,Customer,Amount\n'
+        csv += ''.join(f'{d},{t},cust,1\n' for d, t in rows)
+        self.drive.add_file('f1', 't.csv', csv.encode())
+
+        response = self.client.get('/query?fileName=t.csv&skipRows=1')
+        self.assertEqual(response.status_code, 400, response.get_data(as_text=True))
+        self.assertIn("Available: ['Unnamed: 0'", response.get_json()['error'])
+
+        response = self.client.get('/query?fileName=t.csv&skipRows=2')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertEqual(response.get_json()['data'], self.expected_counts(rows))
+
+    def test_blank_excel_rows_are_not_skipped(self):
+        rows = self.low_cardinality_rows()
+        buf = io.BytesIO()
+        pd.DataFrame(rows, columns=['OrdDate', 'SOType']).to_excel(buf, index=False, startrow=2)
+        self.drive.add_file('f1', 'blank.xlsx', buf.getvalue())
+
+        response = self.client.get('/query?fileName=blank.xlsx&autoDetect=false')
+        self.assertEqual(response.status_code, 400, response.get_data(as_text=True))
+        self.assertIn("Available: ['Unnamed: 0', 'Unnamed: 1']", response.get_json()['error'])
+
+        response = self.client.get('/query?fileName=blank.xlsx&skipRows=2')
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertEqual(response.get_json()['data'], self.expected_counts(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+"""
+WSGI entry point for production servers, e.g. `gunicorn wsgi:app`.
+gunicorn.conf.py sets preload_app, so the app module, and the credential
+files it materialises at import, are loaded once in the master before
+workers are forked.
+"""
+from app import app